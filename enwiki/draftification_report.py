@@ -25,7 +25,7 @@ def get_xfds(pages: Iterable[pywikibot.Page]) -> set[str]:
             prefix = "Miscellany for deletion/"
         prefix += page.title()
         gen = PrefixingPageGenerator(prefix, namespace=4, site=page.site)
-        xfds = xfds.union(xfd_page.title(as_link=True) for xfd_page in gen)
+        xfds.update(xfd_page.title(as_link=True) for xfd_page in gen)
     return xfds
 
 
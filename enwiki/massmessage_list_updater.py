@@ -223,8 +223,8 @@ def get_json_from_page(page: pywikibot.Page) -> dict[str, Any]:
         pywikibot.error(f"{page!r} is a redirect.")
         return {}
     try:
-        return json.loads(page.get().strip())
-    except ValueError:
+        return json.loads(page.text)
+    except json.JSONDecodeError:
         pywikibot.error(f"{page!r} does not contain valid JSON.")
         raise
 
@@ -10,16 +10,70 @@ The following parameters are supported:
 
 from __future__ import annotations
 
+import re
+from collections.abc import Iterable
 from typing import Any
 
 import mwparserfromhell
 import pywikibot
 from pywikibot.bot import ExistingPageBot, MultipleSitesBot
-from pywikibot.pagegenerators import GeneratorFactory, parameterHelp
-from pywikibot_extensions.page import Page, get_redirects
+from pywikibot.data.api import PropertyGenerator
+from pywikibot.pagegenerators import (
+    GeneratorFactory,
+    PreloadingGenerator,
+    parameterHelp,
+)
+from pywikibot.textlib import replaceExcept
 
 
 docuReplacements = {"&params;": parameterHelp}  # noqa: N816
+EXCEPTIONS = ("comment", "math", "nowiki", "pre", "source")
+# Start of a complete wikilink, including any leading colon, unless it
+# already goes through Commons.
+WIKILINK_START = re.compile(
+    r"\[\[(?!\s*:?[cC]:)\s*:?(?=[^\[\]{}|<>\n]+(?:\||\]\]))"
+)
+
+
+def normalize_title(title: str) -> str:
+    """
+    Return the title normalized the same way as Wikicode.matches.
+
+    :param title: title to normalize
+    """
+    title = title.strip().replace("_", " ")
+    return title[:1].upper() + title[1:]
+
+
+def get_template_titles(
+    site: pywikibot.site.BaseSite, titles: Iterable[str]
+) -> dict[str, list[str]]:
+    """
+    Return the titles of templates and their redirects.
+
+    The redirects of all the templates are fetched in a single query.
+
+    :param site: site of the templates
+    :param titles: template titles without the namespace
+    """
+    template_titles: dict[str, list[str]] = {}
+    gen = PropertyGenerator(
+        "redirects",
+        site=site,
+        parameters={
+            "titles": [f"Template:{title}" for title in titles],
+            "rdnamespace": 10,
+            "rdprop": "title",
+            "rdlimit": "max",
+        },
+    )
+    for page_data in gen:
+        template = pywikibot.Page(site, page_data["title"])
+        template_titles[template.title(with_ns=False)] = [
+            pywikibot.Page(site, p["title"]).title(with_ns=False)
+            for p in [page_data, *page_data.get("redirects", [])]
+        ]
+    return template_titles
 
 
 class CommonsPotdImporter(MultipleSitesBot, ExistingPageBot):
@@ -32,50 +86,54 @@ class CommonsPotdImporter(MultipleSitesBot, ExistingPageBot):
         date = self.commons.server_time().date().isoformat()
         self.potd_title = f"Template:Potd/{date}"
         potd_tpl = pywikibot.Page(self.commons, self.potd_title)
-        potd_fn_titles = [
-            p.title(with_ns=False)
-            for p in get_redirects(
-                frozenset((Page(self.commons, "Template:Potd filename"),)),
-                namespaces=10,
-            )
-        ]
+        template_titles = get_template_titles(
+            self.commons, ("Potd filename", "Potd description")
+        )
+        potd_fn_titles = frozenset(
+            map(normalize_title, template_titles["Potd filename"])
+        )
         wikicode = mwparserfromhell.parse(potd_tpl.text, skip_style_tags=True)
         for tpl in wikicode.ifilter_templates():
-            if tpl.name.matches(potd_fn_titles) and tpl.has(
-                "1", ignore_empty=True
-            ):
+            name = normalize_title(tpl.name.strip_code())
+            if name in potd_fn_titles and tpl.has("1", ignore_empty=True):
                 self.potd = tpl.get("1").value.strip()
                 break
         else:
             raise ValueError("Failed to find the POTD.")
-        self.potd_desc_titles = [
-            p.title(with_ns=False)
-            for p in get_redirects(
-                frozenset((Page(self.commons, "Template:Potd description"),)),
-                namespaces=10,
-            )
-        ]
+        self.potd_desc_titles = frozenset(
+            map(normalize_title, template_titles["Potd description"])
+        )
+        self.captions: dict[str, tuple[str, str]] = {}
         # T242081, T243701
         # repo = self.commons.data_repository
         # self.DOC_ITEM = pywikibot.ItemPage(repo, 'Q4608595')
 
-    def treat_page(self) -> None:
-        """Process one page."""
-        site = self.current_page.site
-        # doc_tpl = self.DOC_ITEM.getSitelink(site)
-        doc_tpl = pywikibot.Page(site, "Documentation", ns=10)
-        summary = "Updating Commons picture of the day, "
+    def get_caption(self, lang: str) -> tuple[str, str]:
+        """
+        Return the caption and its attribution for the summary.
+
+        The result is cached since it is the same for every page in the
+        language.
+
+        :param lang: preferred language of the caption
+        """
+        if lang in self.captions:
+            return self.captions[lang]
         caption = ""
-        for lang in (site.lang, "en"):
-            caption_title = f"{self.potd_title} ({lang})"
-            caption_page = pywikibot.Page(self.commons, caption_title)
+        langs = (lang,) if lang == "en" else (lang, "en")
+        caption_pages = PreloadingGenerator(
+            pywikibot.Page(self.commons, f"{self.potd_title} ({code})")
+            for code in langs
+        )
+        for caption_page in caption_pages:
             if not caption_page.exists():
                 continue
             wikicode = mwparserfromhell.parse(
                 caption_page.text, skip_style_tags=True
             )
             for tpl in wikicode.ifilter_templates():
-                if tpl.name.matches(self.potd_desc_titles) and tpl.has(
+                name = normalize_title(tpl.name.strip_code())
+                if name in self.potd_desc_titles and tpl.has(
                     "1", ignore_empty=True
                 ):
                     caption = tpl.get("1").value.strip()
@@ -83,18 +141,29 @@ class CommonsPotdImporter(MultipleSitesBot, ExistingPageBot):
                 # Remove templates, etc.
                 caption = self.commons.expand_text(caption)
                 # Make all interwikilinks go through Commons.
-                caption_wikicode = mwparserfromhell.parse(
-                    caption, skip_style_tags=True
+                caption = replaceExcept(
+                    caption,
+                    WIKILINK_START,
+                    "[[:c:",
+                    EXCEPTIONS,
+                    site=self.commons,
+                )
+                attribution = (
+                    f"[[:c:{caption_page.title()}|caption attribution]]"
                 )
-                for wikilink in caption_wikicode.ifilter_wikilinks():
-                    title = wikilink.title.strip()
-                    prefix = ":c" + ("" if title.startswith(":") else ":")
-                    wikilink.title = prefix + title
-                summary += f"[[:c:{caption_title}|caption attribution]]"
-                caption = str(caption_wikicode)
                 break
         else:
-            summary += "failed to get a caption"
+            attribution = "failed to get a caption"
+        self.captions[lang] = caption, attribution
+        return caption, attribution
+
+    def treat_page(self) -> None:
+        """Process one page."""
+        site = self.current_page.site
+        # doc_tpl = self.DOC_ITEM.getSitelink(site)
+        doc_tpl = pywikibot.Page(site, "Documentation", ns=10)
+        caption, attribution = self.get_caption(site.lang)
+        summary = f"Updating Commons picture of the day, {attribution}"
         text = (
             "<includeonly>{{#switch:{{{1|}}}\n"
             f"|caption={caption}\n"
@@ -120,7 +189,7 @@ def main(*args: str) -> int:
     for arg in script_args:
         if arg == "-always":
             options["always"] = True
-    gen = gen_factory.getCombinedGenerator()
+    gen = gen_factory.getCombinedGenerator(preload=True)
     CommonsPotdImporter(generator=gen, **options).run()
     return 0
 
@@ -16,7 +16,10 @@ from __future__ import annotations
 
 import json
 import re
-from re import Pattern
+import time
+from collections.abc import Callable
+from contextlib import suppress
+from re import Match, Pattern
 from typing import Any
 
 import pywikibot
@@ -26,8 +29,6 @@ from pywikibot.textlib import replaceExcept
 
 
 docuReplacements = {"&params;": parameterHelp}  # noqa: N816
-# For _create_regexes().
-_regexes: dict[str, Pattern[str]] = {}
 
 
 def get_json_from_page(page: pywikibot.Page) -> dict[str, Any]:
@@ -43,8 +44,8 @@ def get_json_from_page(page: pywikibot.Page) -> dict[str, Any]:
         pywikibot.error(f"{page!r} is a redirect.")
         return {}
     try:
-        return json.loads(page.get().strip())
-    except ValueError:
+        return json.loads(page.text)
+    except json.JSONDecodeError:
         pywikibot.error(f"{page!r} does not contain valid JSON.")
         raise
 
@@ -67,11 +68,14 @@ def validate_config(config: dict[str, Any]) -> bool:
     return True
 
 
-def _create_regexes() -> None:
-    """Fill (and possibly overwrite) _regexes with default regexes."""
-    space = r"(?:[^\S\n]|&nbsp;|&\#0*160;|&\#[Xx]0*[Aa]0;)"
-    spaces = rf"{space}+"
+def _create_regexes() -> dict[str, Pattern[str]]:
+    """Return the default regexes."""
+    space = r"(?:[^\S\n]|&(?:nbsp|\#0*160|\#[Xx]0*[Aa]0);)"
+    # Possessive quantifiers, since giving back a space or dash can never
+    # lead to a match.
+    spaces = rf"{space}++"
     space_dash = rf"(?:-|{space})"
+    isbn = rf"(?:97[89]{space_dash}?+)?(?:[0-9]{space_dash}?+){{9}}[0-9Xx]"
     tags = [
         "gallery",
         "math",
@@ -84,50 +88,82 @@ def _create_regexes() -> None:
     # Based on pywikibot.textlib.compileLinkR
     # and https://gist.github.com/gruber/249502
     url = r"""(?:[a-z][\w-]+://[^\]\s<>"]*[^\]\s\.:;,<>"\|\)`!{}'?«»“”‘’])"""
-    _regexes.update(
-        {
-            "bare_url": re.compile(rf"\b({url})", flags=re.I),
-            "bracket_url": re.compile(rf"(\[{url}[^\]]*\])", flags=re.I),
-            "ISBN": re.compile(
-                rf"\bISBN(?P<separator>{spaces})(?P<value>(?:97[89]"
-                rf"{space_dash}?)?(?:[0-9]{space_dash}?){{9}}[0-9Xx])\b"
-            ),
-            "PMID": re.compile(
-                rf"\bPMID(?P<separator>{spaces})(?P<value>[0-9]+)\b"
-            ),
-            "RFC": re.compile(
-                rf"\bRFC(?P<separator>{spaces})(?P<value>[0-9]+)\b"
-            ),
-            "tags": re.compile(
-                r"""(<\/?\w+(?:\s+\w+(?:\s*=\s*(?:(?:"[^"]*")|(?:'[^']*')|"""
-                r"""[^>\s]+))?)*\s*\/?>)"""
-            ),
-            "tags_content": re.compile(
-                rf"(<(?P<tag>{r'|'.join(tags)})\b.*?</(?P=tag)>)",
-                flags=re.I | re.M,
-            ),
-        }
-    )
-
-
-def split_into_sections(text: str) -> list[str]:
-    """
-    Split wikitext into sections based on any level wiki heading.
-
-    :param text: Text to split
+    return {
+        "bare_url": re.compile(rf"\b({url})", flags=re.I),
+        "bracket_url": re.compile(rf"(\[{url}[^\]]*\])", flags=re.I),
+        "ISBN": re.compile(
+            rf"\bISBN(?P<separator>{spaces})(?P<value>{isbn})\b"
+        ),
+        # Any of ISBN, PMID and RFC, matching the same as their own regexes.
+        "magic_link": re.compile(
+            rf"\b(?P<identifier>(?P<ISBN>ISBN)|PMID|RFC)"
+            rf"(?P<separator>{spaces})(?P<value>(?(ISBN){isbn}|[0-9]+))\b"
+        ),
+        "PMID": re.compile(
+            rf"\bPMID(?P<separator>{spaces})(?P<value>[0-9]+)\b"
+        ),
+        "RFC": re.compile(rf"\bRFC(?P<separator>{spaces})(?P<value>[0-9]+)\b"),
+        "tags": re.compile(
+            r"""(<\/?\w++(?:\s++\w++(?:\s*+=\s*+(?:(?:"[^"]*+")|"""
+            r"""(?:'[^']*+')|[^>\s]++))?)*\s*+\/?>)"""
+        ),
+        "tags_content": re.compile(
+            rf"(<(?P<tag>{r'|'.join(tags)})\b.*?</(?P=tag)>)",
+            flags=re.I | re.M,
+        ),
+    }
+
+
+_regexes = _create_regexes()
+# Group references in a replacement, as understood by replaceExcept.
+_group_reference = re.compile(r"\\(\d+)|\\g<(.+?)>")
+
+
+def create_replacement(
+    identifier: str, replacement: str
+) -> Callable[[Match[str]], str]:
+    r"""
+    Return a function that expands the replacement for a magic_link match.
+
+    This expands the same way as replaceExcept does for a string: only
+    \N and \g<name> are substituted, \n becomes a newline and any
+    other backslash is kept. Group numbers refer to the identifier's own
+    regex.
+
+    :param identifier: ISBN, PMID or RFC
+    :param replacement: replacement with group references
+    :raises ValueError: invalid group reference
     """
-    headings_regex = re.compile(
-        r"^={1,6}.*?={1,6}(?: *<!--.*?-->)?\s*$", flags=re.M
-    )
-    sections = []
-    last_match_start = 0
-    for match in headings_regex.finditer(text):
-        match_start = match.start()
-        if match_start > 0:
-            sections.append(text[last_match_start:match_start])
-            last_match_start = match_start
-    sections.append(text[last_match_start:])
-    return sections
+    group_names = {
+        index: name for name, index in _regexes[identifier].groupindex.items()
+    }
+    replacement = replacement.replace("\\n", "\n")
+    literals = []
+    groups: list[int | str] = []
+    last = 0
+    for group_match in _group_reference.finditer(replacement):
+        group: int | str = group_match[1] or group_match[2]
+        with suppress(ValueError):
+            group = int(group)
+        if isinstance(group, int) and group:
+            group = group_names.get(group, "")
+        if group not in (0, *group_names.values()):
+            raise ValueError(
+                f"Invalid group reference in {identifier} replacement: "
+                f"{group_match[0]}"
+            )
+        literals.append(replacement[last : group_match.start()])
+        groups.append(group)
+        last = group_match.end()
+    literals.append(replacement[last:])
+
+    def expand(match: Match[str]) -> str:
+        text = literals[0]
+        for group, literal in zip(groups, literals[1:]):
+            text += (match[group] or "") + literal
+        return text
+
+    return expand
 
 
 class MagicLinksReplacer(SingleSiteBot, ExistingPageBot):
@@ -139,7 +175,14 @@ class MagicLinksReplacer(SingleSiteBot, ExistingPageBot):
     def __init__(self, **kwargs: Any) -> None:
         """Initialize."""
         super().__init__(**kwargs)
-        _create_regexes()
+        self.shutoff_checked = float("-inf")
+        self.identifiers = [
+            key for key in ("ISBN", "PMID", "RFC") if self.opt[key]
+        ]
+        self.replacements = {
+            key: create_replacement(key, self.opt[key])
+            for key in self.identifiers
+        }
         self.replace_exceptions: list[Pattern[str] | str] = [
             _regexes[key]
             for key in ("bare_url", "bracket_url", "tags_content", "tags")
@@ -157,6 +200,11 @@ class MagicLinksReplacer(SingleSiteBot, ExistingPageBot):
 
     def check_disabled(self) -> None:
         """Check if the task is disabled. If so, quit."""
+        # Only check once a minute.
+        now = time.monotonic()
+        if now - self.shutoff_checked < 60:
+            return
+        self.shutoff_checked = now
         class_name = self.__class__.__name__
         page = pywikibot.Page(
             self.site,
@@ -168,22 +216,32 @@ class MagicLinksReplacer(SingleSiteBot, ExistingPageBot):
                 pywikibot.error(f"{class_name} disabled:\n{content}")
                 self.quit()
 
+    def replace_magic_link(self, match: Match[str]) -> str:
+        """
+        Return the replacement for a magic link.
+
+        :param match: match of the magic_link regex
+        """
+        replacement = self.replacements.get(match["identifier"])
+        if replacement is None:
+            return match[0]
+        return replacement(match)
+
     def treat_page(self) -> None:
         """Process one page."""
         self.check_disabled()
-        text = ""
-        for section in split_into_sections(self.current_page.text):
-            for identifier in ("ISBN", "PMID", "RFC"):
-                if self.opt[identifier]:
-                    section = replaceExcept(
-                        section,
-                        _regexes[identifier],
-                        self.opt[identifier],
-                        self.replace_exceptions,
-                        site=self.site,
-                    )
-            text += section
-        self.put_current(text, summary=self.opt.summary)
+        text = self.current_page.text
+        if not any(key in text for key in self.identifiers):
+            return
+        new_text = replaceExcept(
+            text,
+            _regexes["magic_link"],
+            self.replace_magic_link,
+            self.replace_exceptions,
+            site=self.site,
+        )
+        if new_text != text:
+            self.put_current(new_text, summary=self.opt.summary)
 
 
 def main(*args: str) -> int:
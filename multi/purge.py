@@ -4,6 +4,8 @@ from __future__ import annotations
 
 import argparse
 import re
+from collections import defaultdict
+from typing import Any
 
 import pywikibot
 from pywikibot.bot import _GLOBAL_HELP, ExistingPageBot, MultipleSitesBot
@@ -11,7 +13,12 @@ from pywikibot.pagegenerators import GeneratorFactory, parameterHelp
 
 
 class PurgeBot(MultipleSitesBot, ExistingPageBot):
-    """Purge bot."""
+    """
+    Purge bot.
+
+    Pages are purged in batches per site. Pages left in a batch are purged
+    when the bot exits, even if it was stopped early.
+    """
 
     available_options = {
         "converttitles": None,
@@ -19,13 +26,41 @@ class PurgeBot(MultipleSitesBot, ExistingPageBot):
         "forcerecursivelinkupdate": None,
         "redirects": None,
     }
+    # Pages per purge API request.
+    batch_size = 50
+
+    def __init__(self, **kwargs: Any) -> None:
+        """Initialize."""
+        super().__init__(**kwargs)
+        self.batches: defaultdict[
+            pywikibot.site.APISite, list[pywikibot.Page]
+        ] = defaultdict(list)
+
+    def purge(self, site: pywikibot.site.APISite) -> None:
+        """
+        Purge the pages batched for the site.
+
+        :param site: site of the pages
+        """
+        pages = self.batches.pop(site)
+        if site.purgepages(pages, **self.opt):
+            for page in pages:
+                pywikibot.info(f"Purged {page!r}")
+        else:
+            titles = ", ".join(page.title(as_link=True) for page in pages)
+            pywikibot.error(f"Failed to purge {titles}")
+
+    def teardown(self) -> None:
+        """Purge the remaining batched pages."""
+        for site in list(self.batches):
+            self.purge(site)
 
     def treat_page(self) -> None:
         """Process one page."""
-        if self.current_page.purge(**self.opt):
-            pywikibot.info(f"Purged {self.current_page!r}")
-        else:
-            pywikibot.error("Failed to purge {self.current_page}")
+        site = self.current_page.site
+        self.batches[site].append(self.current_page)
+        if len(self.batches[site]) >= self.batch_size:
+            self.purge(site)
 
 
 def main(*args: str) -> int: